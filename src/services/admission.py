@@ -0,0 +1,175 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+# Kabul kontrolü ayarları (ortam değişkenleriyle ayarlanabilir)
+ADMISSION_CONFIG = {
+    'max_in_flight': int(os.getenv('AIKOMBIN_MAX_IN_FLIGHT', '1')),   # Süreç başına aynı anda çalışan çıkarım (ölçek: worker sayısı)
+    'max_queue': int(os.getenv('AIKOMBIN_MAX_QUEUE', '16')),          # Bekleyebilecek istek sayısı
+    'deadline': float(os.getenv('AIKOMBIN_DEADLINE', '10')),          # İstek başına süre sınırı (sn)
+    'fair': os.getenv('AIKOMBIN_FAIR_QUEUE', '1') == '1',             # Kullanıcı bazlı adil sıra
+    'initial_service_time': 1.0,                                      # İlk tahmini çıkarım süresi (sn)
+}
+
+class Overloaded(Exception):
+    """İstek kabul edilmedi; retry_after saniye sonra tekrar denenmeli"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Çıkarım uç noktaları için sınırlı eşzamanlılık, bekleme sırası ve yük atma
+
+    En fazla max_in_flight istek aynı anda çalışır, max_queue istek bekler.
+    Sıra doluysa ya da tahmini bekleme süresi isteğin süre sınırını aşıyorsa
+    istek hemen Overloaded ile reddedilir. fair açıkken bekleyenler kullanıcı
+    bazında sıralanır ve boşalan yer kullanıcılar arasında sırayla dağıtılır.
+    Sıra doluyken gelen istek, en uzun kullanıcı sırasının son bekleyenini
+    çıkararak yer açar; bekleme tahmini de isteğin kendi round-robin konumuna
+    göre yapılır. Böylece toplu yükleme yapan bir kullanıcı diğerlerini ne
+    sırada aç bırakır ne de yük atmaya zorlar.
+    """
+
+    def __init__(self, max_in_flight=None, max_queue=None, deadline=None, fair=None):
+        self.max_in_flight = max_in_flight or ADMISSION_CONFIG['max_in_flight']
+        self.max_queue = ADMISSION_CONFIG['max_queue'] if max_queue is None else max_queue
+        self.deadline = deadline or ADMISSION_CONFIG['deadline']
+        self.fair = ADMISSION_CONFIG['fair'] if fair is None else fair
+
+        self.in_flight = 0
+        self.queued = 0
+        # Kullanıcı -> bekleyen future'lar (fair kapalıyken tek anahtar)
+        self._queues = OrderedDict()
+        # Hareketli ortalama çıkarım süresi
+        self.service_time = ADMISSION_CONFIG['initial_service_time']
+        self.stats = {'admitted': 0, 'shed': 0, 'timed_out': 0}
+
+    def estimated_wait(self, position=None):
+        """Sıradaki konuma göre tahmini bekleme süresi"""
+        position = self.queued if position is None else position
+        return (position + 1) * self.service_time / self.max_in_flight
+
+    def retry_after(self):
+        """Sıra derinliğine göre Retry-After değeri (sn)"""
+        return max(1, math.ceil(self.estimated_wait()))
+
+    def _position(self, key):
+        """Yeni bekleyenin önünde kaç istek olacağı"""
+        if not self.fair:
+            return self.queued
+        # Round-robin: kendi sırasında k kişi varsa diğer her kullanıcıdan
+        # en fazla k + 1 istek önce işlenir
+        own = len(self._queues.get(key, ()))
+        return own + sum(
+            min(len(waiters), own + 1) for k, waiters in self._queues.items() if k != key
+        )
+
+    def _evict_for(self, key):
+        """Sıra doluyken en uzun kullanıcı sırasının son bekleyenini çıkar"""
+        if not self.fair or not self._queues:
+            return False
+        longest = max(self._queues, key=lambda k: len(self._queues[k]))
+        # İsteyen zaten en uzun sıradaysa yer açmanın anlamı yok
+        if longest == key or len(self._queues[longest]) <= len(self._queues.get(key, ())) + 1:
+            return False
+        future = self._queues[longest].pop()
+        self.queued -= 1
+        if not self._queues[longest]:
+            del self._queues[longest]
+        if not future.done():
+            self.stats['shed'] += 1
+            future.set_exception(Overloaded("Sunucu yoğun, sıra adil paylaşım için boşaltıldı",
+                                            self.retry_after()))
+        return True
+
+    @staticmethod
+    def _granted(future):
+        # _dispatch yer ayırıp sonucu yazdıysa True (çıkarılan bekleyende istisna var)
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def _release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _shed(self, message):
+        self.stats['shed'] += 1
+        raise Overloaded(message, self.retry_after())
+
+    def _dispatch(self):
+        """Boşalan yerleri bekleyenlere sırayla dağıt"""
+        while self.in_flight < self.max_in_flight and self._queues:
+            key, waiters = next(iter(self._queues.items()))
+            future = waiters.popleft()
+            if waiters:
+                # Round-robin: kullanıcıyı sıranın sonuna al
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self.queued -= 1
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _remove_waiter(self, key, future):
+        waiters = self._queues.get(key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            return
+        self.queued -= 1
+        if not waiters:
+            del self._queues[key]
+
+    @asynccontextmanager
+    async def admit(self, user_key=None, deadline=None):
+        """İsteği kabul et; çıkarım bu bloğun içinde yapılmalı"""
+        deadline = deadline or self.deadline
+        started = time.monotonic()
+
+        if self.in_flight < self.max_in_flight and not self._queues:
+            self.in_flight += 1
+        else:
+            key = user_key if self.fair else None
+            # Önce süre sınırı: reddedilecek istek için başkası sıradan çıkarılmasın.
+            # Çıkarılan bekleyen en uzun sıranın sonundadır, isteğin konumunu değiştirmez
+            if self.estimated_wait(self._position(key)) > deadline:
+                self._shed("Sunucu yoğun, süre sınırı içinde işlenemez")
+            if self.queued >= self.max_queue and not self._evict_for(key):
+                self._shed("Sunucu yoğun, sıra dolu")
+
+            future = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(key, deque()).append(future)
+            self.queued += 1
+            try:
+                # wait_for yerine wait: future iptal edilmez ve yer ayrıldığı
+                # anda gelen iptal yutulmaz (3.11 wait_for bu durumda döner)
+                await asyncio.wait((future,), timeout=deadline)
+            except BaseException:
+                if self._granted(future):
+                    # Yer ayrılmıştı, geri ver
+                    self._release()
+                else:
+                    self._remove_waiter(key, future)
+                raise
+            if not future.done():
+                self._remove_waiter(key, future)
+                self.stats['timed_out'] += 1
+                raise Overloaded("İstek süre sınırı içinde işlenemedi", self.retry_after())
+            # Adil paylaşım için sıradan çıkarıldıysa Overloaded yükselir
+            future.result()
+
+        self.stats['admitted'] += 1
+        service_started = time.monotonic()
+        try:
+            yield deadline - (service_started - started)
+        finally:
+            elapsed = time.monotonic() - service_started
+            self.service_time = 0.8 * self.service_time + 0.2 * elapsed
+            self._release()
@@ -1,22 +1,40 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from typing import List, Optional
 import base64
+import orjson
 import tempfile
 import os
 import shutil
 import uvicorn
 
-from outfit_analyzer import OutfitAnalyzer
+from outfit_analyzer import OutfitAnalyzer, CPU_PROFILE
 from database import get_db, init_db, DatabaseManager
 from models import User, Clothing, Outfit
+from response_cache import ResponseCache, etag_matches
+from admission import AdmissionController, Overloaded
+from schemas import (
+    ClothingOut, OutfitOut, AnalysisResult, CLOTHING_FIELDS, OUTFIT_FIELDS,
+    select_fields, serialize_clothes, serialize_outfits,
+    clothing_to_dict, outfit_to_dict, compact_analysis
+)
 
 # Global analyzer nesnesi
 analyzer = None
+# Boştaki analyzer örnekleri: kabul edilen her eşzamanlı çıkarım kendi
+# örneğini kullanır (YOLO predictor'ı ve analiz önbelleği thread-safe değil)
+idle_analyzers = []
+
+# Gardırop/kombin okumaları için yanıt önbelleği
+response_cache = ResponseCache()
+
+# Çıkarım uç noktaları için kabul kontrolü
+admission = AdmissionController()
 
 # Yükleme klasörü
 UPLOAD_DIR = os.path.expanduser('~/.aikombin/uploads')
@@ -28,12 +46,14 @@ async def lifespan(app: FastAPI):
     global analyzer
     print("Model yükleniyor...")
     try:
-        analyzer = OutfitAnalyzer()
+        idle_analyzers[:] = _load_analyzers(admission.max_in_flight)
+        analyzer = idle_analyzers[0]
         print("Model başarıyla yüklendi!")
         
-        # Veritabanını başlat
-        init_db()
-        print("Veritabanı başlatıldı!")
+        # Veritabanını başlat (migration ayrı çalıştırılıyorsa atla)
+        if os.getenv('AIKOMBIN_MIGRATE_ON_STARTUP', '1') == '1':
+            init_db()
+            print("Veritabanı başlatıldı!")
     except Exception as e:
         print(f"Başlatma hatası: {str(e)}")
         raise e
@@ -42,7 +62,7 @@ async def lifespan(app: FastAPI):
     if analyzer:
         print("Model kapatılıyor...")
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS ayarları
 app.add_middleware(
@@ -65,9 +85,78 @@ class OutfitMetadata(BaseModel):
     season: str    # ilkbahar, yaz, sonbahar, kış
     notes: Optional[str]
 
+def _load_analyzers(count):
+    """Aynı anda çalışabilecek çıkarım sayısı kadar analyzer örneği yükle"""
+    if count == 1:
+        return [OutfitAnalyzer()]
+    # Eşzamanlı çıkarımlar sürecin çekirdek payını paylaşır
+    threads = CPU_PROFILE['intra_op_threads']
+    profile = {'intra_op_threads': max(1, threads // count)} if threads else None
+    return [OutfitAnalyzer(cpu_profile=profile) for _ in range(count)]
+
+async def _analyze(file_path):
+    """Kabul edilmiş istek için boştaki analyzer örneğiyle analiz yap"""
+    # admit() en fazla max_in_flight isteği içeri alır, liste boş kalmaz
+    instance = idle_analyzers.pop()
+    try:
+        return await run_in_threadpool(instance.analyze_image, file_path)
+    finally:
+        idle_analyzers.append(instance)
+
+def _save_upload(file):
+    """Yüklenen dosyayı istek başına benzersiz bir dosyaya yaz"""
+    suffix = os.path.splitext(file.filename or '')[1]
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=suffix, delete=False) as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return buffer.name
+
+def _discard_upload(file_path):
+    """Geçici dosyayı ve yola bağlı analiz önbelleği kaydını sil"""
+    if file_path is None:
+        return
+    for instance in idle_analyzers:
+        cache = getattr(instance, 'cache', None)
+        if cache is not None:
+            cache.pop(file_path, None)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+def _overloaded_response(e):
+    """Yük atıldığında 503 + Retry-After döndür"""
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(e)},
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def _cached_json(kind, user_id, db_manager, loader, if_none_match=None, variant=None):
+    """Kullanıcı sürümüne bağlı ETag ile koşullu JSON yanıtı döndür
+    
+    loader serileştirilmiş JSON gövdesini (bytes) döndürmelidir.
+    """
+    version = db_manager.get_cache_version(user_id)
+    etag = response_cache.make_etag(kind, user_id, version, variant)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    # İstemcideki kopya güncel
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    body = response_cache.get(etag)
+    if body is None:
+        body = loader()
+        response_cache.set(etag, body)
+        
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # Kıyafet işlemleri
-@app.post("/clothes/analyze")
-async def analyze_clothing(file: UploadFile = File(...)):
+@app.post("/clothes/analyze", response_model=AnalysisResult)
+async def analyze_clothing(
+    request: Request,
+    file: UploadFile = File(...),
+    compact: bool = False,
+    x_user_id: Optional[str] = Header(None)
+):
     """Kıyafet analizi endpoint'i"""
     try:
         # Model hazır mı kontrol et
@@ -78,25 +167,28 @@ async def analyze_clothing(file: UploadFile = File(...)):
                 headers={"Retry-After": "10"}
             )
         
-        # Dosyayı kaydet
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        try:
-            # Analiz yap
-            result = analyzer.analyze_image(file_path)
-            return JSONResponse(content=result)
+        user_key = x_user_id or (request.client.host if request.client else None)
+        async with admission.admit(user_key):
+            # Dosyayı kaydet
+            file_path = _save_upload(file)
             
-        finally:
-            # Dosyayı sil
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            try:
+                # Analiz yap (event loop'u bloklamadan)
+                result = await _analyze(file_path)
+                if compact:
+                    result = compact_analysis(result)
+                return ORJSONResponse(content=result)
+                
+            finally:
+                # Dosyayı sil
+                _discard_upload(file_path)
                 
+    except Overloaded as e:
+        return _overloaded_response(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/clothes")
+@app.post("/clothes", response_model=ClothingOut)
 async def add_clothing(
     user_id: int,
     file: UploadFile = File(...),
@@ -104,59 +196,100 @@ async def add_clothing(
 ):
     """Gardıroba kıyafet ekleme"""
     try:
-        # Dosyayı kaydet
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_path = None
         
         try:
-            # Analiz yap
-            result = analyzer.analyze_image(file_path)
-            if not result["success"]:
-                raise HTTPException(status_code=400, detail=result["error"])
+            async with admission.admit(str(user_id)):
+                # Dosyayı kaydet
+                file_path = _save_upload(file)
+                
+                # Analiz yap (event loop'u bloklamadan)
+                result = await _analyze(file_path)
+            if not result["kıyafet_var_mı"]:
+                raise HTTPException(status_code=400, detail="Görüntüde kıyafet tespit edilemedi")
             
             # Kıyafeti veritabanına ekle
             db_manager = DatabaseManager(db)
+            analysis = result["analiz"]
             clothing_data = {
-                "category": result["category"],
-                "subcategory": result["subcategory"],
-                "color": result["color"],
-                "style": result["style"],
+                "category": analysis["kategori"],
+                "subcategory": analysis["alt_kategori"],
+                "color": analysis["renkler"][0] if analysis["renkler"] else None,
+                "palette": analysis["renkler"],
+                "style": analysis["stil"],
                 "image_url": file_path  # Gerçek uygulamada S3 URL'i olacak
             }
             
             clothing = db_manager.add_clothing(user_id, clothing_data)
-            return clothing
+            return clothing_to_dict(clothing)
             
         finally:
             # Dosyayı sil
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            _discard_upload(file_path)
                 
+    except Overloaded as e:
+        return _overloaded_response(e)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/clothes/{user_id}")
+@app.get("/clothes/{user_id}", response_model=List[ClothingOut])
 async def get_wardrobe(
     user_id: int,
     category: Optional[str] = None,
+    fields: Optional[str] = None,
+    compact: bool = False,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Gardırop içeriğini getir"""
+    """Gardırop içeriğini getir
+    
+    fields virgülle ayrılmış alan listesi, compact ağır alanları çıkarır.
+    """
+    try:
+        select_fields(CLOTHING_FIELDS, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+        
     try:
         db_manager = DatabaseManager(db)
-        clothes = db_manager.get_user_wardrobe(user_id)
         
-        if category:
-            clothes = [c for c in clothes if c.category == category]
+        def load():
+            clothes = db_manager.get_user_wardrobe(user_id)
+            if category:
+                clothes = [c for c in clothes if c.category == category]
+            return serialize_clothes(clothes, fields, compact)
             
-        return clothes
+        variant = f"{category}|{fields}|{compact}"
+        return _cached_json("clothes", user_id, db_manager, load, if_none_match, variant)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/clothes/{user_id}/near-color", response_model=List[ClothingOut])
+async def get_clothes_near_color(
+    user_id: int,
+    color: str,
+    max_distance: float = 20.0,
+    limit: int = 20,
+    fields: Optional[str] = None,
+    compact: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Gardıropta verilen renge (#rrggbb) yakın kıyafetleri getir"""
+    try:
+        db_manager = DatabaseManager(db)
+        clothes = db_manager.find_clothes_near_color(user_id, color, max_distance, limit)
+        return Response(content=serialize_clothes(clothes, fields, compact), media_type="application/json")
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Kombin işlemleri
-@app.post("/outfits")
+@app.post("/outfits", response_model=OutfitOut)
 async def create_outfit(
     user_id: int,
     clothing_ids: List[int],
@@ -171,21 +304,58 @@ async def create_outfit(
             metadata.dict(),
             clothing_ids
         )
-        return outfit
+        return outfit_to_dict(outfit)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/outfits/{user_id}")
+@app.get("/outfits/{user_id}", response_model=List[OutfitOut])
 async def get_outfits(
     user_id: int,
+    fields: Optional[str] = None,
+    compact: bool = False,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Kullanıcının kombinlerini getir"""
+    try:
+        select_fields(OUTFIT_FIELDS, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+        
+    try:
+        db_manager = DatabaseManager(db)
+        return _cached_json(
+            "outfits",
+            user_id,
+            db_manager,
+            lambda: serialize_outfits(db_manager.get_user_outfits(user_id), fields, compact),
+            if_none_match,
+            f"{fields}|{compact}"
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# İstatistikler
+@app.get("/stats/{user_id}")
+async def get_stats(
+    user_id: int,
+    top_worn: int = 5,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Kategori, renk, stil dağılımı ve en çok giyilen kıyafetler"""
     try:
         db_manager = DatabaseManager(db)
-        outfits = db_manager.get_user_outfits(user_id)
-        return outfits
+        return _cached_json(
+            "stats",
+            user_id,
+            db_manager,
+            lambda: orjson.dumps(db_manager.get_wardrobe_stats(user_id, top_worn)),
+            if_none_match,
+            str(top_worn)
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,237 @@
+"""Arşivlenmiş fotoğraflar için paralel, kaldığı yerden devam edebilen toplu analiz
+
+Kullanım:
+    python batch_analyze.py --input-dir /arsiv/fotograflar --output sonuclar.jsonl --processes 4
+    python batch_analyze.py --file-list liste.txt --output sonuclar.jsonl
+
+Sonuçlar satır başına bir JSON kaydı olarak çıktı dosyasına eklenir. Çıktı
+dosyası aynı zamanda ilerleme kaydıdır: yeniden başlatılan bir çalışma,
+dosyada başarılı kaydı bulunan görüntüleri atlar. Analizi hata veren
+görüntüler "hata" kaydıyla yazılır, silinmez ve sonraki çalışmada yeniden denenir;
+yeniden başlatmada eski hata kayıtları dosyadan temizlenir, böylece her yol için
+en fazla bir kayıt kalır. Bir worker süreci beklenmedik şekilde ölürse (OOM,
+native kod çökmesi) çalışma ilerlemeyi diske yazıp sıfırdan farklı kodla çıkar;
+aynı komutla kaldığı yerden devam edilebilir.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Desteklenen görüntü uzantıları
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp'}
+
+# Toplu işlem ayarları
+BATCH_CONFIG = {
+    'flush_every': 100,      # Kaç kayıtta bir diske yazılacak
+    'report_every': 5.0,     # İlerleme raporu aralığı (saniye)
+    'chunksize': 8,          # Worker başına tek seferde gönderilen görüntü
+}
+
+# Worker sürecindeki analyzer
+_analyzer = None
+_delete_empty = False
+
+def _init_worker(threads, delete_empty):
+    """Her süreç kendi model örneğini yükler"""
+    global _analyzer, _delete_empty
+    from outfit_analyzer import OutfitAnalyzer
+
+    _analyzer = OutfitAnalyzer(cpu_profile={'intra_op_threads': threads, 'inter_op_threads': 1})
+    _delete_empty = delete_empty
+
+def _analyze(path):
+    """Tek görüntüyü analiz et, kayıt olarak döndür"""
+    try:
+        results = _analyzer.process_and_save(path, delete_empty=_delete_empty, raise_errors=True)
+    except Exception as e:
+        # Bozuk ya da geçici olarak okunamayan görüntü: tamamlandı sayılmaz, silinmez
+        return {'path': path, 'hata': f"{type(e).__name__}: {e}"}
+    finally:
+        # Toplu işlemde aynı yol tekrar gelmez, süreç önbelleğini büyütme
+        _analyzer.cache.pop(path, None)
+    return {'path': path, 'sonuç': results}
+
+def _analyze_chunk(paths):
+    return [_analyze(path) for path in paths]
+
+def iter_inputs(input_dir=None, file_list=None):
+    """Dizindeki ya da listedeki görüntü yollarını sıralı olarak üret"""
+    if file_list:
+        with open(file_list, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield os.path.abspath(line)
+    if input_dir:
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    yield os.path.abspath(os.path.join(root, name))
+
+def _truncate_partial_tail(f, chunk_size=64 * 1024):
+    """Çökme sırasında yarım yazılmış son satırı kes (yalnızca dosya sonu okunur)"""
+    end = f.seek(0, os.SEEK_END)
+    if end == 0:
+        return
+    f.seek(end - 1)
+    if f.read(1) == b'\n':
+        return
+
+    pos = end
+    while pos > 0:
+        start = max(0, pos - chunk_size)
+        f.seek(start)
+        chunk = f.read(pos - start)
+        newline = chunk.rfind(b'\n')
+        if newline >= 0:
+            f.truncate(start + newline + 1)
+            return
+        pos = start
+    f.truncate(0)
+
+def load_checkpoint(output_path):
+    """Çıktı dosyasından başarıyla işlenmiş yolları satır satır oku"""
+    done = set()
+    failed = 0
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, 'rb+') as f:
+        _truncate_partial_tail(f)
+        f.seek(0)
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            # Hata kayıtları tamamlanmış sayılmaz, yeniden denenir
+            if 'hata' in record:
+                failed += 1
+            elif 'path' in record:
+                done.add(record['path'])
+
+    if failed:
+        _drop_failures(output_path)
+    return done
+
+def _drop_failures(output_path):
+    """Yeniden denenecek hata kayıtlarını dosyadan çıkar (satır satır, atomik)"""
+    tmp_path = output_path + '.tmp'
+    with open(output_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for line in src:
+            try:
+                if 'hata' in json.loads(line):
+                    continue
+            except ValueError:
+                pass
+            dst.write(line)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp_path, output_path)
+
+def _format_eta(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def run(paths, output_path, processes, threads, delete_empty=False):
+    """Görüntüleri süreç havuzunda analiz et ve JSONL'e ekle"""
+    done = load_checkpoint(output_path)
+    pending = [p for p in paths if p not in done]
+    total = len(pending)
+    print(f"{len(done)} görüntü daha önce işlenmiş, {total} görüntü kaldı")
+    if not total:
+        return
+
+    ctx = mp.get_context('spawn')
+    chunksize = BATCH_CONFIG['chunksize']
+    chunks = (pending[i:i + chunksize] for i in range(0, total, chunksize))
+    processed = 0
+    failed = 0
+    start = last_report = time.perf_counter()
+
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(processes, mp_context=ctx, initializer=_init_worker,
+                                initargs=(threads, delete_empty)) as pool:
+        running = set()
+        # Model yükleme süresini hıza katma
+        started = False
+        try:
+            while True:
+                # Bellekte sınırlı sayıda iş tut
+                while len(running) < processes * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    running.add(pool.submit(_analyze_chunk, chunk))
+                if not running:
+                    break
+
+                # Worker ölürse BrokenProcessPool yükselir (Pool gibi sonsuza dek beklemez)
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                broken = None
+                for future in finished:
+                    try:
+                        records = future.result()
+                    except BrokenProcessPool as e:
+                        # Biten diğer işlerin sonuçlarını yine de yaz
+                        broken = e
+                        continue
+                    for record in records:
+                        if not started:
+                            start = last_report = time.perf_counter()
+                            started = True
+
+                        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                        processed += 1
+                        if 'hata' in record:
+                            failed += 1
+
+                        if processed % BATCH_CONFIG['flush_every'] == 0:
+                            out.flush()
+                            os.fsync(out.fileno())
+
+                        now = time.perf_counter()
+                        if now - last_report >= BATCH_CONFIG['report_every'] or processed == total:
+                            rate = processed / max(now - start, 1e-9)
+                            eta = (total - processed) / rate if rate > 0 else 0
+                            print(f"{processed}/{total} görüntü ({failed} hata), {rate:.2f} görüntü/sn, "
+                                  f"kalan süre {_format_eta(eta)}",
+                                  file=sys.stderr)
+                            last_report = now
+                if broken is not None:
+                    raise broken
+        finally:
+            # Çökmede de o ana kadarki sonuçlar kalıcı olsun
+            out.flush()
+            os.fsync(out.fileno())
+
+def main():
+    parser = argparse.ArgumentParser(description="Toplu kıyafet analizi")
+    parser.add_argument('--input-dir', help="Görüntülerin bulunduğu dizin")
+    parser.add_argument('--file-list', help="Satır başına bir görüntü yolu içeren dosya")
+    parser.add_argument('--output', required=True, help="Sonuçların ekleneceği JSONL dosyası")
+    parser.add_argument('--processes', type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument('--threads', type=int, default=2, help="Süreç başına torch thread sayısı")
+    parser.add_argument('--delete-empty', action='store_true',
+                        help="Kıyafet bulunmayan görüntüleri sil (varsayılan: silme)")
+    args = parser.parse_args()
+
+    if not args.input_dir and not args.file_list:
+        parser.error("--input-dir veya --file-list gerekli")
+
+    paths = list(dict.fromkeys(iter_inputs(args.input_dir, args.file_list)))
+    try:
+        run(paths, args.output, args.processes, args.threads, args.delete_empty)
+    except BrokenProcessPool:
+        print("Bir worker süreci beklenmedik şekilde sonlandı (bellek yetersizliği ya da çökme); "
+              "ilerleme kaydedildi, aynı komutla devam edilebilir", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
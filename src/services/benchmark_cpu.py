@@ -0,0 +1,110 @@
+"""CPU çıkarım profili için worker × thread benchmark matrisi
+
+Kullanım:
+    python benchmark_cpu.py --workers 1 2 4 --threads 1 2 4 --iterations 50
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+from torchvision import models
+
+from outfit_analyzer import MODEL_CONFIG, CPU_PROFILE, apply_cpu_threads, optimize_cpu_model
+
+def _worker(profile, iterations, warmup, cache_dir, barrier, queue):
+    """Tek bir worker: modeli kur, ısın, gecikmeleri ölç"""
+    apply_cpu_threads(profile)
+    model = models.resnet50(weights=None).eval()
+    model = optimize_cpu_model(model, profile, cache_dir, 'resnet50_bench')
+
+    memory_format = torch.channels_last if profile.get('channels_last') else torch.contiguous_format
+    dummy = torch.rand(1, 3, *MODEL_CONFIG['input_size']).contiguous(memory_format=memory_format)
+
+    with torch.inference_mode():
+        for _ in range(warmup):
+            model(dummy)
+
+        # Tüm worker'lar ısındıktan sonra aynı anda başlasın
+        barrier.wait()
+        latencies = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            model(dummy)
+            latencies.append(time.perf_counter() - t0)
+
+    queue.put(latencies)
+
+def run_case(workers, threads, iterations, warmup, profile, cache_dir):
+    """Tek bir (worker, thread) kombinasyonunu ölç"""
+    profile = {**profile, 'intra_op_threads': threads, 'inter_op_threads': 1}
+    ctx = mp.get_context('spawn')
+    # Worker'lar + ölçüm yapan ana süreç
+    barrier = ctx.Barrier(workers + 1)
+    queue = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(profile, iterations, warmup, cache_dir, barrier, queue))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    # Model yükleme, derleme ve ısınma bitince saat başlar
+    barrier.wait()
+    t0 = time.perf_counter()
+    latencies = []
+    for _ in procs:
+        latencies.extend(queue.get())
+    elapsed = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'workers': workers,
+        'threads': threads,
+        'throughput': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU çıkarım benchmark matrisi")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--compile', choices=['none', 'torchscript', 'compile'], default=CPU_PROFILE['compile'])
+    parser.add_argument('--no-channels-last', action='store_true')
+    args = parser.parse_args()
+
+    profile = {
+        **CPU_PROFILE,
+        'compile': args.compile,
+        'channels_last': not args.no_channels_last,
+    }
+    cpu_count = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # TorchScript artefaktını worker'lar yarışmadan önce bir kez oluştur
+        if profile['compile'] == 'torchscript':
+            optimize_cpu_model(models.resnet50(weights=None).eval(), profile, cache_dir, 'resnet50_bench')
+
+        results = []
+        for workers in args.workers:
+            for threads in args.threads:
+                if workers * threads > cpu_count * 2:
+                    continue
+                result = run_case(workers, threads, args.iterations, args.warmup, profile, cache_dir)
+                print(f"workers={workers} threads={threads} "
+                      f"throughput={result['throughput']}/s p99={result['p99_ms']}ms")
+                results.append(result)
+
+    print(json.dumps({'cpu_count': cpu_count, 'profile': profile, 'results': results}, indent=2))
+
+if __name__ == "__main__":
+    main()
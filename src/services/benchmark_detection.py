@@ -0,0 +1,134 @@
+"""Tespit son işleme mikro benchmark'ı: kutu başına döngü vs. vektörel yol
+
+İki taraf da aynı kıyafet listesini üretir; birleştirme (merge_overlapping)
+varsayılan olarak kapalı olduğundan ayrı bir sütunda ölçülür.
+
+torch kuruluysa kutular torch tensörü olarak (YOLO'daki gibi) üretilir,
+değilse numpy dizileri kullanılır.
+
+Kullanım:
+    python benchmark_detection.py --sizes 10 100 1000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from detection import build_class_lookup, extract_detections, filter_clothing, merge_overlapping
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# outfit_analyzer.CLOTHING_CLASSES ile aynı eşleme (modelleri yüklememek için kopya)
+CLOTHING_CLASSES = {
+    398: 'üst giyim', 399: 'üst giyim', 400: 'üst giyim',
+    401: 'alt giyim', 402: 'alt giyim',
+    403: 'ayakkabı', 404: 'ayakkabı',
+    405: 'aksesuar', 406: 'aksesuar', 407: 'aksesuar'
+}
+MERGE_IOU = 0.6
+
+class FakeBoxes:
+    """ultralytics Boxes benzeri: toplu erişim ve kutu başına iterasyon"""
+
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy, self.cls, self.conf = xyxy, cls, conf
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield FakeBoxes(self.xyxy[i:i + 1], self.cls[i:i + 1], self.conf[i:i + 1])
+
+class FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+def make_results(n, rng):
+    xy = rng.uniform(0, 600, size=(n, 2))
+    wh = rng.uniform(20, 200, size=(n, 2))
+    xyxy = np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+    # Yarısı kıyafet sınıfı, yarısı diğer sınıflar
+    cls = np.where(rng.random(n) < 0.5, rng.integers(398, 408, n), rng.integers(0, 80, n)).astype(np.float32)
+    conf = rng.uniform(0.3, 1.0, n).astype(np.float32)
+    if torch is not None:
+        xyxy, cls, conf = torch.from_numpy(xyxy), torch.from_numpy(cls), torch.from_numpy(conf)
+    return [FakeResult(FakeBoxes(xyxy, cls, conf))]
+
+def legacy(results):
+    """Eski analyze_image döngüsü: kutu başına Python nesnesi, birleştirme yok"""
+    detections = []
+    for r in results:
+        boxes = r.boxes
+        for box in boxes:
+            b = box.xyxy[0].tolist()
+            # Eski int(box.cls) / float(box.conf); numpy 1 elemanlı dizide .item() gerekir
+            cls = int(box.cls.item())
+            conf = float(box.conf.item())
+            
+            if cls in CLOTHING_CLASSES:
+                detection = {
+                    'class': CLOTHING_CLASSES[cls],
+                    'confidence': conf,
+                    'box': b
+                }
+                detections.append(detection)
+    return detections
+
+def vectorized(results, lookup, merge=False):
+    detections = filter_clothing(*extract_detections(results), lookup)
+    if merge:
+        detections = merge_overlapping(detections, MERGE_IOU)
+    return detections.to_list(lookup.names)
+
+def timeit(fn, min_time=0.5):
+    fn()
+    runs = 0
+    started = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return elapsed / runs * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Tespit son işleme mikro benchmark'ı")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    lookup = build_class_lookup(CLOTHING_CLASSES)
+    report = []
+    for n in args.sizes:
+        results = make_results(n, rng)
+        legacy_ms = timeit(lambda: legacy(results))
+        vector_ms = timeit(lambda: vectorized(results, lookup))
+        merge_ms = timeit(lambda: vectorized(results, lookup, merge=True))
+        kept = len(vectorized(results, lookup))
+        # Aynı girdi, aynı çıktı: ölçülen fark yalnızca son işlemenin maliyeti
+        assert kept == len(legacy(results))
+        merged = len(vectorized(results, lookup, merge=True))
+        report.append({
+            'boxes': n,
+            'legacy_ms': round(legacy_ms, 3),
+            'vectorized_ms': round(vector_ms, 3),
+            'speedup': round(legacy_ms / vector_ms, 2),
+            'kept': kept,
+            # İsteğe bağlı birleştirme adımı (MODEL_CONFIG['merge_overlapping']), ayrı raporlanır
+            'vectorized_merge_ms': round(merge_ms, 3),
+            'kept_after_merge': merged,
+        })
+        print(f"n={n:<5} legacy {legacy_ms:9.3f} ms  vectorized {vector_ms:8.3f} ms  "
+              f"x{legacy_ms / vector_ms:.2f}  kept={kept}  "
+              f"(+merge {merge_ms:8.3f} ms, kept={merged})")
+
+    print(json.dumps({'backend': 'torch' if torch is not None else 'numpy', 'results': report}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Gardırop ve analiz yanıtları için serileştirme benchmark'ı
+
+Kullanım:
+    python benchmark_serialization.py --sizes 10 1000 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from colors import color_columns
+from models import Clothing
+from schemas import ClothingOut, serialize_clothes, compact_analysis
+import orjson
+
+def make_clothes(n):
+    """Veritabanına yazılmamış, tüm sütunları dolu Clothing nesneleri"""
+    clothes = []
+    for i in range(n):
+        palette = ['#{:06x}'.format(random.getrandbits(24)) for _ in range(3)]
+        clothes.append(Clothing(
+            id=i + 1,
+            category='üst giyim',
+            subcategory='tişört',
+            style='casual',
+            image_url=f"https://cdn.example.com/clothes/{i}.jpg",
+            created_at=datetime.utcnow(),
+            **color_columns(palette)
+        ))
+    return clothes
+
+def make_analysis(n_detections=10):
+    return {
+        "kıyafet_var_mı": True,
+        "tespit": {
+            "kıyafetler": [
+                {'class': 'üst giyim', 'confidence': random.random(), 'box': [random.random() * 500 for _ in range(4)]}
+                for _ in range(n_detections)
+            ],
+            "güven": 0.87
+        },
+        "analiz": {
+            "kategori": "üst giyim",
+            "alt_kategori": "tişört",
+            "renkler": ['#1a2b3c', '#f0f0f0', '#808080'],
+            "renk_adları": ['lacivert', 'beyaz', 'gri'],
+            "stil": "casual",
+            "vit_analiz": {'label': 'jersey, T-shirt, tee shirt', 'score': 0.81}
+        }
+    }
+
+def timeit(fn, min_time=0.5):
+    """fn'i en az min_time saniye çalıştır, çağrı başına süreyi (ms) ve çıktı boyutunu döndür"""
+    fn()
+    runs = 0
+    started = time.perf_counter()
+    while True:
+        body = fn()
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return elapsed / runs * 1000, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serileştirme benchmark'ı")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000])
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(List[ClothingOut])
+    results = []
+
+    for n in args.sizes:
+        clothes = make_clothes(n)
+        cases = {
+            'jsonable_encoder+json': lambda: json.dumps(
+                jsonable_encoder(clothes), ensure_ascii=False, separators=(",", ":")
+            ).encode('utf-8'),
+            'pydantic_dump_json': lambda: adapter.dump_json(adapter.validate_python(clothes, from_attributes=True)),
+            'orjson': lambda: serialize_clothes(clothes),
+            'orjson_compact': lambda: serialize_clothes(clothes, compact=True),
+            'orjson_fields': lambda: serialize_clothes(clothes, fields='id,category,color'),
+        }
+        for name, fn in cases.items():
+            ms, size = timeit(fn)
+            results.append({'payload': 'clothes', 'items': n, 'method': name, 'ms': round(ms, 3), 'bytes': size})
+            print(f"clothes n={n:<6} {name:<24} {ms:9.3f} ms {size:>10} B")
+
+    analysis = make_analysis()
+    cases = {
+        'json': lambda: json.dumps(analysis, ensure_ascii=False, separators=(",", ":")).encode('utf-8'),
+        'orjson': lambda: orjson.dumps(analysis),
+        'orjson_compact': lambda: orjson.dumps(compact_analysis(analysis)),
+    }
+    for name, fn in cases.items():
+        ms, size = timeit(fn)
+        results.append({'payload': 'analysis', 'items': 1, 'method': name, 'ms': round(ms, 4), 'bytes': size})
+        print(f"analysis         {name:<24} {ms:9.4f} ms {size:>10} B")
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import math
+import re
+
+import numpy as np
+
+# Renk kovası ayarları (CIELAB)
+COLOR_CONFIG = {
+    'l_bucket_size': 10.0,   # L* (0-100) kova genişliği
+    'ab_bucket_size': 16.0,  # a*, b* kova genişliği
+    'dark_lightness': 20.0,  # Bu değerin altı koyu renk
+    'light_lightness': 85.0, # Bu değerin üstü açık renk
+}
+
+# Renk adları tablosu (sRGB)
+NAMED_COLORS = {
+    'siyah': '#000000',
+    'koyu gri': '#404040',
+    'gri': '#808080',
+    'açık gri': '#c0c0c0',
+    'beyaz': '#ffffff',
+    'krem': '#fffdd0',
+    'bej': '#d8c8a8',
+    'kahverengi': '#6b4423',
+    'taba': '#a0522d',
+    'bordo': '#800020',
+    'kırmızı': '#d0202a',
+    'pembe': '#f4a6c0',
+    'fuşya': '#d0208a',
+    'turuncu': '#f07020',
+    'hardal': '#d4a017',
+    'sarı': '#f5d90a',
+    'haki': '#8a865d',
+    'zeytin yeşili': '#556b2f',
+    'yeşil': '#2e8b3a',
+    'koyu yeşil': '#0b3d1f',
+    'turkuaz': '#30c0c0',
+    'açık mavi': '#9cc7ef',
+    'mavi': '#2456c8',
+    'lacivert': '#101c4c',
+    'mor': '#6a2c91',
+    'lila': '#c8a2c8',
+}
+
+# sRGB (D65) -> XYZ dönüşüm matrisi
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+
+# Kabul edilen renk kodu biçimleri: #rgb, #rrggbb ('#' isteğe bağlı)
+_HEX_COLOR = re.compile(r'^#?([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$')
+
+def hex_to_rgb(colors):
+    """'#rrggbb' listesini (N, 3) uint8 dizisine dönüştür (büyük/küçük harf fark etmez)"""
+    if isinstance(colors, str):
+        colors = [colors]
+    values = []
+    for c in colors:
+        if not isinstance(c, str) or not _HEX_COLOR.fullmatch(c):
+            raise ValueError(f"Geçersiz renk kodu: {c!r} (#rgb ya da #rrggbb bekleniyor)")
+        c = c.lstrip('#')
+        if len(c) == 3:
+            # Kısa biçim: #abc -> #aabbcc
+            c = ''.join(ch * 2 for ch in c)
+        values.append(int(c, 16))
+    arr = np.array(values, dtype=np.uint32).reshape(-1, 1)
+    return ((arr >> np.array([16, 8, 0], dtype=np.uint32)) & 0xFF).astype(np.uint8)
+
+def rgb_to_lab(rgb):
+    """(N, 3) sRGB dizisini (N, 3) CIELAB dizisine dönüştür"""
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE_D65
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2]),
+    ], axis=1)
+
+def hex_to_lab(colors):
+    """Hex renk(ler)ini CIELAB'a dönüştür"""
+    return rgb_to_lab(hex_to_rgb(colors))
+
+def lab_bucket(lab):
+    """Tek bir Lab değerini (L, a, b) kova indekslerine dönüştür"""
+    return (
+        int(math.floor(lab[0] / COLOR_CONFIG['l_bucket_size'])),
+        int(math.floor(lab[1] / COLOR_CONFIG['ab_bucket_size'])),
+        int(math.floor(lab[2] / COLOR_CONFIG['ab_bucket_size'])),
+    )
+
+def bucket_ranges(lab, max_distance):
+    """max_distance (ΔE76) içindeki tüm renkleri kapsayan kova aralıkları"""
+    ranges = []
+    for value, size in zip(lab, (
+        COLOR_CONFIG['l_bucket_size'],
+        COLOR_CONFIG['ab_bucket_size'],
+        COLOR_CONFIG['ab_bucket_size'],
+    )):
+        ranges.append((
+            int(math.floor((value - max_distance) / size)),
+            int(math.floor((value + max_distance) / size)),
+        ))
+    return ranges
+
+def color_columns(palette):
+    """Renk paletinden Clothing renk sütunlarının değerlerini üret"""
+    palette = [c for c in (palette or []) if c]
+    if not palette:
+        return {}
+
+    lab = hex_to_lab(palette[0])[0]
+    l_bucket, a_bucket, b_bucket = lab_bucket(lab)
+    return {
+        'color': palette[0].lower(),
+        'color_name': color_names.nearest(palette[:1])[0],
+        'palette': [c.lower() for c in palette],
+        'color_lab_l': float(lab[0]),
+        'color_lab_a': float(lab[1]),
+        'color_lab_b': float(lab[2]),
+        'color_l_bucket': l_bucket,
+        'color_a_bucket': a_bucket,
+        'color_b_bucket': b_bucket,
+    }
+
+def delta_e(lab, targets):
+    """Bir Lab değeri ile (N, 3) Lab dizisi arasındaki ΔE76 mesafeleri"""
+    return np.linalg.norm(np.asarray(targets, dtype=np.float64) - np.asarray(lab), axis=-1)
+
+class ColorNameTable:
+    """Önceden hesaplanmış Lab tablosu üzerinden vektörel en yakın renk adı araması"""
+
+    def __init__(self, named_colors=NAMED_COLORS):
+        self.names = np.array(list(named_colors))
+        self.lab = hex_to_lab(list(named_colors.values()))
+
+    def nearest(self, colors):
+        """Hex renk listesine karşılık gelen renk adlarını döndür"""
+        if not colors:
+            return []
+        lab = hex_to_lab(colors)
+        # (N, M) mesafe matrisi, tek argmin ile eşleştirme
+        distances = ((lab[:, None, :] - self.lab[None, :, :]) ** 2).sum(axis=2)
+        return self.names[distances.argmin(axis=1)].tolist()
+
+# Modül yüklenirken bir kez hesaplanır
+color_names = ColorNameTable()
+
+def color_lightness(color):
+    """Hex rengin L* değeri (0-100)"""
+    return float(hex_to_lab(color)[0, 0])
@@ -1,7 +1,15 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, func, inspect, or_, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from .models import Base
+
+# Hem paket (services.database) hem de düz modül (app.py) olarak içe aktarılabilir
+try:
+    from .models import Base, User, Clothing, Outfit, StylePreference, WardrobeStat, user_clothes, outfit_clothes
+    from .colors import color_columns, hex_to_lab, bucket_ranges, delta_e
+except ImportError:
+    from models import Base, User, Clothing, Outfit, StylePreference, WardrobeStat, user_clothes, outfit_clothes
+    from colors import color_columns, hex_to_lab, bucket_ranges, delta_e
 
 from dotenv import load_dotenv
 import os
@@ -12,15 +20,139 @@ load_dotenv()
 # PostgreSQL bağlantı URL'i
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Engine oluştur
-engine = create_engine(DATABASE_URL)
+# Engine oluştur (SQLite yalnızca yerel test/yük testi için)
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+else:
+    engine = create_engine(DATABASE_URL)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# create_all mevcut tablolara sütun eklemez; sonradan eklenen sütunlar
+# (tablo, sütun, DDL) olarak burada listelenir ve init_db'de eklenir
+MIGRATION_COLUMNS = [
+    ('users', 'cache_version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('clothes', 'palette', 'JSON'),
+    ('clothes', 'color_lab_l', 'FLOAT'),
+    ('clothes', 'color_lab_a', 'FLOAT'),
+    ('clothes', 'color_lab_b', 'FLOAT'),
+    ('clothes', 'color_l_bucket', 'INTEGER'),
+    ('clothes', 'color_a_bucket', 'INTEGER'),
+    ('clothes', 'color_b_bucket', 'INTEGER'),
+    ('clothes', 'color_name', 'VARCHAR'),
+]
+
+# Eski kayıtlarda baskın renkten yeniden hesaplanan renk sütunları
+BACKFILL_COLOR_COLUMNS = (
+    'color_name', 'palette', 'color_lab_l', 'color_lab_a', 'color_lab_b',
+    'color_l_bucket', 'color_a_bucket', 'color_b_bucket',
+)
+
+# Birden çok worker aynı anda başlarken migration'ı tek sürece yaptıran
+# PostgreSQL advisory lock anahtarı
+MIGRATION_LOCK_KEY = 0x61696b6f  # 'aiko'
+
+def migrate_db():
+    """Mevcut tablolarda eksik sütunları ALTER TABLE ile ekle"""
+    inspector = inspect(engine)
+    # Kilit dışından çağrılırsa da eşzamanlı ekleme hata vermesin
+    if_not_exists = ' IF NOT EXISTS' if engine.dialect.name == 'postgresql' else ''
+    with engine.begin() as conn:
+        for table, column, ddl in MIGRATION_COLUMNS:
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column not in existing:
+                print(f"Sütun ekleniyor: {table}.{column}")
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN{if_not_exists} {column} {ddl}'))
+
+        # create_all mevcut tablolara indeks de eklemez
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+    backfill_color_columns()
+
+def backfill_color_columns(batch_size=500):
+    """Renk sütunları boş kalan eski kıyafetleri baskın renkten doldur"""
+    session = SessionLocal()
+    try:
+        last_id = 0
+        updated = 0
+        while True:
+            rows = (
+                session.query(Clothing.id, Clothing.color, Clothing.palette)
+                .filter(
+                    Clothing.id > last_id,
+                    Clothing.color.isnot(None),
+                    or_(Clothing.color_l_bucket.is_(None), Clothing.color_name.is_(None))
+                )
+                .order_by(Clothing.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+                
+            values = []
+            for clothing_id, color, palette in rows:
+                try:
+                    columns = color_columns(palette or [color])
+                except ValueError:
+                    # Geçersiz renk kodu: kayıt renk aramasının dışında kalır
+                    continue
+                values.append({'id': clothing_id, **{c: columns[c] for c in BACKFILL_COLOR_COLUMNS}})
+            last_id = rows[-1][0]
+            
+            # Birincil anahtara göre toplu UPDATE (yalnızca verilen sütunlar)
+            if values:
+                session.execute(update(Clothing), values)
+                _invalidate_owners(session, [v['id'] for v in values])
+            session.commit()
+            updated += len(values)
+            
+        if updated:
+            print(f"{updated} kıyafetin renk sütunları dolduruldu")
+    finally:
+        session.close()
+
+def _invalidate_owners(session, clothing_ids):
+    """Renk sütunları değişen kıyafetlerin sahiplerinin özetini ve ETag'ini geçersiz kıl"""
+    owners = session.query(user_clothes.c.user_id).filter(
+        user_clothes.c.clothing_id.in_(clothing_ids)
+    ).distinct().subquery()
+    # Özet bir sonraki okumada/yazmada GROUP BY ile yeniden oluşturulur
+    session.query(WardrobeStat).filter(
+        WardrobeStat.user_id.in_(owners.select())
+    ).delete(synchronize_session=False)
+    session.query(User).filter(User.id.in_(owners.select())).update(
+        {User.cache_version: func.coalesce(User.cache_version, 0) + 1}, synchronize_session=False
+    )
+
 def init_db():
-    """Veritabanı tablolarını oluştur"""
-    Base.metadata.create_all(bind=engine)
+    """Veritabanı tablolarını oluştur ve eksik sütunları ekle
+    
+    PostgreSQL'de işi advisory lock'u ilk alan worker yapar; aynı anda
+    başlayan diğer worker'lar onun bitmesini bekler ve migration'ı atlar.
+    """
+    if engine.dialect.name != 'postgresql':
+        Base.metadata.create_all(bind=engine)
+        migrate_db()
+        return
+        
+    with engine.connect() as lock_conn:
+        acquired = lock_conn.execute(
+            text('SELECT pg_try_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY}
+        ).scalar()
+        if not acquired:
+            print("Migration başka bir worker tarafından yapılıyor, bekleniyor...")
+            lock_conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+        try:
+            if acquired:
+                Base.metadata.create_all(bind=engine)
+                migrate_db()
+        finally:
+            lock_conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            lock_conn.commit()
 
 def get_db():
     """Database session context manager"""
@@ -35,37 +167,90 @@ class DatabaseManager:
     def __init__(self, session):
         self.session = session
     
+    # Önbellek sürümü işlemleri
+    def get_cache_version(self, user_id):
+        """Kullanıcının önbellek sürümünü getir (ETag için)"""
+        row = self.session.query(User.cache_version).filter(User.id == user_id).first()
+        if row is None:
+            raise ValueError("Kullanıcı bulunamadı")
+            
+        return row[0] or 0
+    
+    def _bump_cache_version(self, user):
+        """Gardırop/kombin değiştiğinde önbellek sürümünü artır
+        
+        Artış SQL'de yapılır (UPDATE ... SET cache_version = cache_version + 1);
+        eşzamanlı ikinci yazma satır kilidini bekler ve aynı sürümü üretemez.
+        """
+        user.cache_version = func.coalesce(User.cache_version, 0) + 1
+    
     # Kıyafet işlemleri
     def add_clothing(self, user_id, clothing_data):
         """Yeni kıyafet ekle"""
-        from .models import Clothing, User
-        
         user = self.session.query(User).filter(User.id == user_id).first()
         if not user:
             raise ValueError("Kullanıcı bulunamadı")
             
+        # Renk sütunlarını (Lab, kova, palet) doldur
+        palette = clothing_data.get("palette") or [clothing_data.get("color")]
+        clothing_data = {**clothing_data, **color_columns(palette)}
+        
         clothing = Clothing(**clothing_data)
         clothing.owners.append(user)
+        self._bump_cache_version(user)
         
         self.session.add(clothing)
+        self._update_stats(user_id, [
+            ("total", "items"),
+            ("category", clothing.category),
+            ("color", clothing.color_name),
+            ("style", clothing.style),
+        ])
         self.session.commit()
         return clothing
     
     def get_user_wardrobe(self, user_id):
         """Kullanıcının gardırobunu getir"""
-        from .models import User
-        
         user = self.session.query(User).filter(User.id == user_id).first()
         if not user:
             raise ValueError("Kullanıcı bulunamadı")
             
         return user.wardrobe
     
+    def find_clothes_near_color(self, user_id, color, max_distance=20.0, limit=20):
+        """Gardıropta verilen renge yakın kıyafetleri getir
+        
+        Kullanıcının kıyafetleri (user_id, clothing_id) indeksinden okunur,
+        adaylar renk kovalarıyla daraltılır, ardından ΔE76 mesafesine göre
+        elenip sıralanır.
+        """
+        lab = hex_to_lab(color)[0]
+        (l_min, l_max), (a_min, a_max), (b_min, b_max) = bucket_ranges(lab, max_distance)
+        
+        candidates = self.session.query(Clothing).join(
+            user_clothes, user_clothes.c.clothing_id == Clothing.id
+        ).filter(
+            user_clothes.c.user_id == user_id,
+            Clothing.color_l_bucket.between(l_min, l_max),
+            Clothing.color_a_bucket.between(a_min, a_max),
+            Clothing.color_b_bucket.between(b_min, b_max)
+        ).all()
+        
+        if not candidates:
+            return []
+            
+        distances = delta_e(lab, [
+            (c.color_lab_l, c.color_lab_a, c.color_lab_b) for c in candidates
+        ])
+        ranked = sorted(
+            ((d, c) for d, c in zip(distances.tolist(), candidates) if d <= max_distance),
+            key=lambda item: item[0]
+        )
+        return [c for _, c in ranked[:limit]]
+    
     # Kombin işlemleri
     def create_outfit(self, user_id, outfit_data, clothing_ids):
         """Yeni kombin oluştur"""
-        from .models import Outfit, Clothing, User
-        
         user = self.session.query(User).filter(User.id == user_id).first()
         if not user:
             raise ValueError("Kullanıcı bulunamadı")
@@ -82,26 +267,29 @@ class DatabaseManager:
         outfit = Outfit(**outfit_data)
         outfit.user = user
         outfit.clothes = clothes
+        self._bump_cache_version(user)
         
         self.session.add(outfit)
+        self._update_stats(
+            user_id,
+            [("total", "outfits")] + [("worn", str(c.id)) for c in clothes]
+        )
         self.session.commit()
         return outfit
     
     def get_user_outfits(self, user_id):
         """Kullanıcının kombinlerini getir"""
-        from .models import User
-        
-        user = self.session.query(User).filter(User.id == user_id).first()
-        if not user:
+        if self.session.query(User.id).filter(User.id == user_id).first() is None:
             raise ValueError("Kullanıcı bulunamadı")
             
-        return user.outfits
+        # Kıyafet id'leri tek sorguda yüklenir (kombin başına lazy load yok)
+        return self.session.query(Outfit).options(
+            selectinload(Outfit.clothes).load_only(Clothing.id)
+        ).filter(Outfit.user_id == user_id).order_by(Outfit.id).all()
     
     # Stil tercihleri işlemleri
     def update_style_preferences(self, user_id, preferences):
         """Kullanıcının stil tercihlerini güncelle"""
-        from .models import StylePreference, User
-        
         user = self.session.query(User).filter(User.id == user_id).first()
         if not user:
             raise ValueError("Kullanıcı bulunamadı")
@@ -120,4 +308,140 @@ class DatabaseManager:
             )
             self.session.add(pref)
             
+        self._bump_cache_version(user)
         self.session.commit()
+    
+    # Gardırop istatistikleri
+    def compute_wardrobe_stats(self, user_id):
+        """İstatistikleri GROUP BY sorgularıyla sıfırdan hesapla
+        
+        Returns:
+            Dict: (boyut, anahtar) -> adet
+        """
+        counts = {}
+        
+        counts[("total", "items")] = self.session.query(func.count()).select_from(user_clothes).filter(
+            user_clothes.c.user_id == user_id
+        ).scalar()
+        counts[("total", "outfits")] = self.session.query(func.count(Outfit.id)).filter(
+            Outfit.user_id == user_id
+        ).scalar()
+        
+        for dimension, column in (
+            ("category", Clothing.category),
+            ("color", Clothing.color_name),
+            ("style", Clothing.style),
+        ):
+            rows = self.session.query(column, func.count()).join(
+                user_clothes, user_clothes.c.clothing_id == Clothing.id
+            ).filter(
+                user_clothes.c.user_id == user_id,
+                column.isnot(None)
+            ).group_by(column).all()
+            for key, count in rows:
+                counts[(dimension, key)] = count
+        
+        rows = self.session.query(outfit_clothes.c.clothing_id, func.count()).join(
+            Outfit, Outfit.id == outfit_clothes.c.outfit_id
+        ).filter(
+            Outfit.user_id == user_id
+        ).group_by(outfit_clothes.c.clothing_id).all()
+        for clothing_id, count in rows:
+            counts[("worn", str(clothing_id))] = count
+            
+        return counts
+    
+    def rebuild_wardrobe_stats(self, user_id):
+        """Özet tablosunu GROUP BY sonuçlarıyla yeniden oluştur (commit etmez)"""
+        self.session.query(WardrobeStat).filter(WardrobeStat.user_id == user_id).delete()
+        for (dimension, key), count in self.compute_wardrobe_stats(user_id).items():
+            self.session.add(WardrobeStat(user_id=user_id, dimension=dimension, key=key, count=count))
+        self.session.flush()
+    
+    def _lock_user(self, user_id):
+        """Kullanıcı satırını kilitle; özetin ilk oluşturulması kullanıcı bazında sıralanır"""
+        self.session.query(User.id).filter(User.id == user_id).with_for_update().first()
+    
+    def _update_stats(self, user_id, keys):
+        """Özet tablosundaki sayaçları artır (commit etmez)"""
+        self.session.flush()
+        self._lock_user(user_id)
+        
+        # Özeti hiç oluşmamış kullanıcı (eski kayıtlar): sıfırdan hesapla
+        initialized = self.session.query(WardrobeStat.id).filter(
+            WardrobeStat.user_id == user_id,
+            WardrobeStat.dimension == "total"
+        ).first()
+        if initialized is None:
+            self.rebuild_wardrobe_stats(user_id)
+            return
+        
+        for dimension, key in keys:
+            if key is None:
+                continue
+            updated = self.session.query(WardrobeStat).filter(
+                WardrobeStat.user_id == user_id,
+                WardrobeStat.dimension == dimension,
+                WardrobeStat.key == key
+            ).update({WardrobeStat.count: WardrobeStat.count + 1}, synchronize_session=False)
+            if updated:
+                continue
+            try:
+                # Aynı anahtar eşzamanlı eklenirse savepoint geri alınır ve artırılır
+                with self.session.begin_nested():
+                    self.session.add(WardrobeStat(user_id=user_id, dimension=dimension, key=key, count=1))
+            except IntegrityError:
+                self.session.query(WardrobeStat).filter(
+                    WardrobeStat.user_id == user_id,
+                    WardrobeStat.dimension == dimension,
+                    WardrobeStat.key == key
+                ).update({WardrobeStat.count: WardrobeStat.count + 1}, synchronize_session=False)
+    
+    def get_wardrobe_stats(self, user_id, top_worn=5):
+        """Kullanıcının kategori, renk, stil dağılımı ve en çok giyilen kıyafetleri"""
+        if self.session.query(User.id).filter(User.id == user_id).first() is None:
+            raise ValueError("Kullanıcı bulunamadı")
+            
+        rows = self.session.query(WardrobeStat.dimension, WardrobeStat.key, WardrobeStat.count).filter(
+            WardrobeStat.user_id == user_id,
+            WardrobeStat.dimension != "worn"
+        ).all()
+        if not rows:
+            # Eşzamanlı yazma ya da okuma özeti oluşturmuş olabilir: kilitten sonra tekrar bak
+            self._lock_user(user_id)
+            initialized = self.session.query(WardrobeStat.id).filter(
+                WardrobeStat.user_id == user_id,
+                WardrobeStat.dimension == "total"
+            ).first()
+            if initialized is None:
+                self.rebuild_wardrobe_stats(user_id)
+            self.session.commit()
+            return self.get_wardrobe_stats(user_id, top_worn)
+        
+        stats = {
+            "total_items": 0,
+            "total_outfits": 0,
+            "categories": {},
+            "colors": {},
+            "styles": {},
+        }
+        for dimension, key, count in rows:
+            if dimension == "total":
+                stats[f"total_{key}"] = count
+            elif count > 0:
+                stats[{"category": "categories", "color": "colors", "style": "styles"}[dimension]][key] = count
+        
+        # (user_id, dimension, count) indeksi üzerinden ilk N kayıt
+        worn = self.session.query(WardrobeStat.key, WardrobeStat.count).filter(
+            WardrobeStat.user_id == user_id,
+            WardrobeStat.dimension == "worn"
+        ).order_by(WardrobeStat.count.desc()).limit(top_worn).all()
+        stats["most_worn"] = [{"clothing_id": int(key), "count": count} for key, count in worn]
+        
+        return stats
+
+if __name__ == "__main__":
+    # Tek seferlik migration: python database.py
+    # (AIKOMBIN_MIGRATE_ON_STARTUP=0 ile worker'lar başlangıçta migration yapmaz)
+    init_db()
+    print("Veritabanı migration tamamlandı")
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+
+# Vektörel tespit son işleme
+
+class ClassLookup(NamedTuple):
+    """Sınıf id'sinden kategori indeksine önceden hesaplanmış tablo"""
+    index: np.ndarray  # (max_id + 1,) int16, kıyafet değilse -1
+    names: np.ndarray  # Kategori adları
+
+@dataclass(frozen=True)
+class Detections:
+    """Son serileştirmeye kadar taşınan kompakt tespit dizileri
+
+    len() kutu sayısını verir; bu yüzden tuple değil (NamedTuple'da
+    _replace ve tuple sözleşmesi bozulurdu).
+    """
+    __slots__ = ('xyxy', 'category', 'confidence')
+
+    xyxy: np.ndarray        # (N, 4) float32
+    category: np.ndarray    # (N,) int16, ClassLookup.names indeksi
+    confidence: np.ndarray  # (N,) float32
+
+    def __len__(self):
+        return len(self.confidence)
+
+    def to_list(self, names):
+        """API'nin beklediği sözlük listesine dönüştür"""
+        boxes = self.xyxy.tolist()
+        categories = names[self.category].tolist()
+        confidences = self.confidence.tolist()
+        return [
+            {'class': c, 'confidence': conf, 'box': b}
+            for c, conf, b in zip(categories, confidences, boxes)
+        ]
+
+def build_class_lookup(class_map):
+    """{sınıf_id: kategori} sözlüğünden arama tablosu oluştur"""
+    names = sorted(set(class_map.values()))
+    index = np.full(max(class_map) + 1, -1, dtype=np.int16)
+    for cls, name in class_map.items():
+        index[cls] = names.index(name)
+    return ClassLookup(index, np.array(names))
+
+def _to_numpy(values):
+    # torch tensörlerini tek seferde CPU'ya al (kutu başına senkronizasyon yok)
+    if hasattr(values, 'cpu'):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+def extract_detections(results):
+    """YOLO sonuçlarından xyxy/cls/conf dizilerini bütün olarak çek"""
+    xyxy, cls, conf = [], [], []
+    for r in results:
+        boxes = r.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        xyxy.append(_to_numpy(boxes.xyxy).astype(np.float32, copy=False).reshape(-1, 4))
+        cls.append(_to_numpy(boxes.cls).astype(np.int64, copy=False).reshape(-1))
+        conf.append(_to_numpy(boxes.conf).astype(np.float32, copy=False).reshape(-1))
+
+    if not xyxy:
+        return (
+            np.empty((0, 4), dtype=np.float32),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float32),
+        )
+    return np.concatenate(xyxy), np.concatenate(cls), np.concatenate(conf)
+
+def filter_clothing(xyxy, cls, conf, lookup):
+    """Kıyafet olmayan sınıfları arama tablosuyla tek adımda ele"""
+    valid = (cls >= 0) & (cls < len(lookup.index))
+    category = np.full(len(cls), -1, dtype=np.int16)
+    category[valid] = lookup.index[cls[valid]]
+    keep = category >= 0
+    return Detections(xyxy[keep], category[keep], conf[keep])
+
+def pairwise_iou(a, b):
+    """(N, 4) ve (M, 4) kutular arasındaki (N, M) IoU matrisi"""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    intersection = wh[..., 0] * wh[..., 1]
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+def merge_overlapping(detections, iou_threshold):
+    """Aynı kategoride çakışan kutuları tek matris işlemiyle birleştir
+
+    Fast NMS: kutular güvene göre sıralanır, daha yüksek güvenli aynı
+    kategorideki herhangi bir kutuyla IoU'su eşiği aşan kutu atılır.
+    Klasik NMS'deki sıralı döngü yoktur.
+    """
+    if len(detections) < 2:
+        return detections
+
+    order = np.argsort(-detections.confidence, kind='stable')
+    xyxy = detections.xyxy[order]
+    category = detections.category[order]
+    confidence = detections.confidence[order]
+
+    iou = pairwise_iou(xyxy, xyxy)
+    # Sadece aynı kategori ve daha yüksek güvenli (üst üçgen) çiftler
+    iou = np.where(category[:, None] == category[None, :], iou, 0)
+    iou = np.triu(iou, k=1)
+    keep = iou.max(axis=0) <= iou_threshold
+
+    return Detections(xyxy[keep], category[keep], confidence[keep])
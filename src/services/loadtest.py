@@ -0,0 +1,248 @@
+"""FastAPI servisi için yerel asenkron yük testi
+
+Uygulama süreç içinde başlatılır: gerçek OutfitAnalyzer yerine ayarlanabilir
+gecikmeli bir sahte analyzer kullanılır, veritabanı olarak SQLite (varsayılan)
+ya da yerel bir PostgreSQL verilebilir. Sanal kullanıcılar /clothes/analyze,
+POST /clothes, GET /clothes/{user_id} ve /outfits uç noktalarına gerçekçi bir
+karışımla istek atar; sonuçlar uç nokta bazında JSON olarak raporlanır.
+
+Kullanım:
+    python loadtest.py --users 50 --duration 30 --analyzer-latency 0.2
+    python loadtest.py --database-url postgresql://localhost/aikombin_load --output sonuc.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+# Uç nokta karışımı (ağırlıklar)
+REQUEST_MIX = {
+    'POST /clothes/analyze': 0.15,
+    'POST /clothes': 0.10,
+    'GET /clothes/{user_id}': 0.45,
+    'POST /outfits': 0.05,
+    'GET /outfits/{user_id}': 0.25,
+}
+
+# Sahte analiz sonucunda kullanılan değerler
+STUB_CATEGORIES = [
+    ('üst giyim', 'tişört', 'casual'),
+    ('üst giyim', 'palto', 'formal'),
+    ('alt giyim', 'pantolon', 'classic'),
+    ('ayakkabı', 'spor ayakkabı', 'sporty'),
+    ('aksesuar', 'çanta', 'accessory'),
+]
+
+def install_stub_analyzer(latency):
+    """outfit_analyzer modülünü modelsiz, sabit gecikmeli bir sahte sürümle değiştir"""
+
+    class StubOutfitAnalyzer:
+        def __init__(self, cpu_profile=None):
+            self.latency = latency
+
+        def analyze_image(self, image_path):
+            # Gerçek çıkarım gibi thread'i meşgul et
+            time.sleep(self.latency)
+            category, subcategory, style = random.choice(STUB_CATEGORIES)
+            return {
+                "kıyafet_var_mı": True,
+                "tespit": {
+                    "kıyafetler": [{'class': category, 'confidence': 0.9, 'box': [10.0, 20.0, 200.0, 300.0]}],
+                    "güven": 0.9
+                },
+                "analiz": {
+                    "kategori": category,
+                    "alt_kategori": subcategory,
+                    "renkler": ['#1a2b3c', '#f0f0f0', '#808080'],
+                    "renk_adları": ['lacivert', 'beyaz', 'gri'],
+                    "stil": style,
+                    "vit_analiz": {'label': 'jersey, T-shirt, tee shirt', 'score': 0.8}
+                }
+            }
+
+    module = types.ModuleType('outfit_analyzer')
+    module.OutfitAnalyzer = StubOutfitAnalyzer
+    module.CPU_PROFILE = {'intra_op_threads': 0}
+    sys.modules['outfit_analyzer'] = module
+
+def seed_users(session_factory, count, items_per_user):
+    """Test kullanıcılarını ve başlangıç gardıroplarını oluştur"""
+    from models import User, Clothing
+    from colors import color_columns
+
+    session = session_factory()
+    try:
+        user_ids = []
+        for i in range(count):
+            user = User(
+                username=f"load_{i}_{random.getrandbits(32):x}",
+                email=f"load_{i}_{random.getrandbits(32):x}@example.com",
+                password_hash="x"
+            )
+            for j in range(items_per_user):
+                category, subcategory, style = STUB_CATEGORIES[j % len(STUB_CATEGORIES)]
+                user.wardrobe.append(Clothing(
+                    category=category,
+                    subcategory=subcategory,
+                    style=style,
+                    image_url=f"seed/{i}/{j}.jpg",
+                    **color_columns(['#{:06x}'.format(random.getrandbits(24))])
+                ))
+            session.add(user)
+            session.flush()
+            user_ids.append(user.id)
+        session.commit()
+
+        wardrobes = {
+            uid: [c.id for c in session.get(User, uid).wardrobe]
+            for uid in user_ids
+        }
+        return wardrobes
+    finally:
+        session.close()
+
+def percentile(sorted_values, q):
+    """Sıralı listeden en yakın sıra yöntemiyle yüzdelik"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(samples, elapsed):
+    """Uç nokta bazında throughput, gecikme yüzdelikleri ve hata oranı"""
+    report = {}
+    for endpoint, entries in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in entries)
+        statuses = {}
+        for _, status in entries:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(1 for _, status in entries if status == 'error' or status >= 400)
+        report[endpoint] = {
+            'requests': len(entries),
+            'throughput_rps': round(len(entries) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'error_rate': round(errors / len(entries), 4),
+            'status_counts': statuses,
+        }
+    return report
+
+async def virtual_user(client, user_id, wardrobe, end_time, samples, use_etag, think_time):
+    """Tek bir sanal kullanıcının istek döngüsü"""
+    endpoints = list(REQUEST_MIX)
+    weights = list(REQUEST_MIX.values())
+    etags = {}
+    image = os.urandom(2048)
+
+    while time.perf_counter() < end_time:
+        endpoint = random.choices(endpoints, weights)[0]
+        headers = {'X-User-Id': str(user_id)}
+        started = time.perf_counter()
+        try:
+            if endpoint == 'POST /clothes/analyze':
+                files = {'file': (f"{user_id}_{random.getrandbits(64):x}.jpg", io.BytesIO(image), 'image/jpeg')}
+                response = await client.post('/clothes/analyze', files=files, headers=headers)
+            elif endpoint == 'POST /clothes':
+                files = {'file': (f"{user_id}_{random.getrandbits(64):x}.jpg", io.BytesIO(image), 'image/jpeg')}
+                response = await client.post('/clothes', params={'user_id': user_id}, files=files)
+                if response.status_code == 200 and 'id' in response.json():
+                    wardrobe.append(response.json()['id'])
+            elif endpoint == 'POST /outfits':
+                body = {
+                    'clothing_ids': random.sample(wardrobe, min(3, len(wardrobe))),
+                    'metadata': {
+                        'name': 'yük testi',
+                        'occasion': 'günlük',
+                        'mood': 'rahat',
+                        'weather': 'sıcak',
+                        'season': 'yaz',
+                        'notes': None
+                    }
+                }
+                response = await client.post('/outfits', params={'user_id': user_id}, json=body)
+            else:
+                path = endpoint.split(' ', 1)[1].replace('{user_id}', str(user_id))
+                if use_etag and path in etags:
+                    headers['If-None-Match'] = etags[path]
+                response = await client.get(path, headers=headers)
+                if 'etag' in response.headers:
+                    etags[path] = response.headers['etag']
+            status = response.status_code
+        except Exception:
+            status = 'error'
+
+        samples.setdefault(endpoint, []).append((time.perf_counter() - started, status))
+        if think_time:
+            await asyncio.sleep(random.expovariate(1 / think_time))
+
+async def run(args):
+    import httpx
+    import app as app_module
+    from database import SessionLocal
+
+    app = app_module.app
+    async with app.router.lifespan_context(app):
+        wardrobes = seed_users(SessionLocal, args.users, args.items_per_user)
+
+        transport = httpx.ASGITransport(app=app)
+        samples = {}
+        async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=args.timeout) as client:
+            started = time.perf_counter()
+            end_time = started + args.duration
+            await asyncio.gather(*(
+                virtual_user(client, uid, wardrobe, end_time, samples, not args.no_etag, args.think_time)
+                for uid, wardrobe in wardrobes.items()
+            ))
+            elapsed = time.perf_counter() - started
+
+    total = sum(len(entries) for entries in samples.values())
+    return {
+        'config': {
+            'users': args.users,
+            'duration_s': args.duration,
+            'analyzer_latency_s': args.analyzer_latency,
+            'items_per_user': args.items_per_user,
+            'etag': not args.no_etag,
+            'database': args.database_url.split('://')[0],
+        },
+        'total': {'requests': total, 'throughput_rps': round(total / elapsed, 2)},
+        'endpoints': summarize(samples, elapsed),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Aikombin API yük testi")
+    parser.add_argument('--users', type=int, default=20, help="Eşzamanlı sanal kullanıcı sayısı")
+    parser.add_argument('--duration', type=float, default=20, help="Test süresi (sn)")
+    parser.add_argument('--analyzer-latency', type=float, default=0.2, help="Sahte analiz süresi (sn)")
+    parser.add_argument('--items-per-user', type=int, default=30, help="Başlangıç gardırop boyutu")
+    parser.add_argument('--think-time', type=float, default=0.0, help="İstekler arası ortalama bekleme (sn)")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--no-etag', action='store_true', help="If-None-Match göndermeyi kapat")
+    parser.add_argument('--database-url', help="Varsayılan: geçici SQLite dosyası")
+    parser.add_argument('--output', help="JSON raporun yazılacağı dosya")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='aikombin_load_')
+    if not args.database_url:
+        args.database_url = f"sqlite:///{os.path.join(tmp_dir, 'load.db')}"
+    # database modülü içe aktarılmadan önce ayarlanmalı
+    os.environ['DATABASE_URL'] = args.database_url
+
+    install_stub_analyzer(args.analyzer_latency)
+    report = asyncio.run(run(args))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Kabul kontrolü için yerel aşırı yük testi
+
+Sahte bir çıkarım (sabit süreli, `cores` thread'lik havuzda) kapasitenin
+üzerinde istekle yüklenir. Kabul kontrolü olmadan gecikme sıra boyunca
+büyürken, kontrol açıkken başarılı isteklerin p99 değeri süre sınırıyla
+sınırlı kalır ve fazlası 503 ile reddedilir.
+
+Kullanım:
+    python loadtest_admission.py --rate 40 --duration 10 --service-time 0.1 --cores 2
+    python loadtest_admission.py --check   # yalnızca regresyon kontrolleri
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from admission import AdmissionController, Overloaded
+
+def _fake_inference(service_time):
+    time.sleep(service_time)
+
+def _percentiles(latencies):
+    if not latencies:
+        return {'p50_ms': None, 'p99_ms': None}
+    arr = np.array(latencies) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(arr, 50)), 1),
+        'p99_ms': round(float(np.percentile(arr, 99)), 1),
+    }
+
+async def run(controller, rate, duration, service_time, cores, bulk_share):
+    """Poisson gelişli istekler üret; kullanıcı bazında sonuçları topla"""
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=cores)
+    results = {'bulk': [], 'interactive': []}
+    shed = {'bulk': 0, 'interactive': 0}
+
+    async def request(user):
+        kind = 'bulk' if user == 'bulk' else 'interactive'
+        started = time.perf_counter()
+        try:
+            if controller is None:
+                await loop.run_in_executor(executor, _fake_inference, service_time)
+            else:
+                async with controller.admit(user):
+                    await loop.run_in_executor(executor, _fake_inference, service_time)
+            results[kind].append(time.perf_counter() - started)
+        except Overloaded:
+            shed[kind] += 1
+
+    tasks = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        # Toplu yükleyici isteklerin bulk_share kadarını gönderir
+        user = 'bulk' if random.random() < bulk_share else f"user-{random.randint(1, 50)}"
+        tasks.append(asyncio.create_task(request(user)))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    executor.shutdown()
+
+    return {
+        kind: {'ok': len(results[kind]), 'shed': shed[kind], **_percentiles(results[kind])}
+        for kind in results
+    }
+
+async def _check_evict_after_deadline():
+    """Süre sınırıyla reddedilen istek, sıradan başka bir isteği çıkarmamalı"""
+    controller = AdmissionController(max_in_flight=1, max_queue=10, deadline=6.5, fair=True)
+    release = asyncio.Event()
+    errors = {}
+
+    async def request(user):
+        try:
+            async with controller.admit(user):
+                await release.wait()
+        except Overloaded as e:
+            errors[user] = str(e)
+
+    # Bir istek çalışıyor, sırada 5 toplu + 5 tekil kullanıcı (sıra dolu)
+    users = ['running'] + ['bulk'] * 5 + [f"user-{i}" for i in range(5)]
+    tasks = [asyncio.create_task(request(user)) for user in users]
+    await asyncio.sleep(0)
+    assert controller.queued == 10, controller.queued
+
+    # Yeni kullanıcının konumu 6, tahmini bekleme 7 sn > 6.5 sn: yalnızca o reddedilir
+    await request('new-user')
+    assert list(errors) == ['new-user'], errors
+    assert controller.stats['shed'] == 1, controller.stats
+    assert len(controller._queues['bulk']) == 5
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert controller.in_flight == 0 and controller.queued == 0
+
+def regression_checks():
+    asyncio.run(_check_evict_after_deadline())
+    print("Regresyon kontrolleri geçti")
+
+def main():
+    parser = argparse.ArgumentParser(description="Kabul kontrolü aşırı yük testi")
+    parser.add_argument('--rate', type=float, default=40, help="Saniyedeki istek sayısı")
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--service-time', type=float, default=0.1, help="Sahte çıkarım süresi (sn)")
+    parser.add_argument('--cores', type=int, default=2)
+    parser.add_argument('--max-queue', type=int, default=16)
+    parser.add_argument('--deadline', type=float, default=2.0)
+    parser.add_argument('--bulk-share', type=float, default=0.7, help="Toplu yükleyicinin istek oranı")
+    parser.add_argument('--check', action='store_true', help="Yalnızca regresyon kontrollerini çalıştır")
+    args = parser.parse_args()
+
+    if args.check:
+        regression_checks()
+        return
+
+    capacity = args.cores / args.service_time
+    print(f"Kapasite ~{capacity:.1f} istek/sn, yük {args.rate:.1f} istek/sn")
+
+    report = {'capacity_rps': capacity, 'offered_rps': args.rate}
+    report['no_admission'] = asyncio.run(
+        run(None, args.rate, args.duration, args.service_time, args.cores, args.bulk_share)
+    )
+    for fair in (False, True):
+        controller = AdmissionController(
+            max_in_flight=args.cores, max_queue=args.max_queue, deadline=args.deadline, fair=fair
+        )
+        controller.service_time = args.service_time
+        report['fair' if fair else 'fifo'] = asyncio.run(
+            run(controller, args.rate, args.duration, args.service_time, args.cores, args.bulk_share)
+        )
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
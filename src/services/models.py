@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table, Boolean, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -10,7 +10,9 @@ user_clothes = Table(
     'user_clothes',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id')),
-    Column('clothing_id', Integer, ForeignKey('clothes.id'))
+    Column('clothing_id', Integer, ForeignKey('clothes.id')),
+    # Gardırop sorguları kullanıcıdan başlar (renk araması, istatistikler)
+    Index('ix_user_clothes_user', 'user_id', 'clothing_id')
 )
 
 # Kombin-Kıyafet ilişki tablosu
@@ -29,6 +31,7 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    cache_version = Column(Integer, default=0, nullable=False)  # Gardırop/kombin yazmalarında artar (ETag)
     
     # İlişkiler
     wardrobe = relationship("Clothing", secondary=user_clothes, back_populates="owners")
@@ -41,14 +44,28 @@ class Clothing(Base):
     id = Column(Integer, primary_key=True)
     category = Column(String, nullable=False)  # üst_giyim, alt_giyim, ayakkabı, aksesuar
     subcategory = Column(String, nullable=False)  # tişört, gömlek, pantolon, vs.
-    color = Column(String)
+    color = Column(String)  # Baskın renk (#rrggbb)
+    color_name = Column(String)  # Baskın rengin adı (siyah, lacivert vs.)
+    palette = Column(JSON)  # Tüm baskın renkler
     style = Column(String)  # spor, klasik, günlük vs.
     image_url = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Baskın rengin CIELAB değeri ve renk araması için kovaları
+    color_lab_l = Column(Float)
+    color_lab_a = Column(Float)
+    color_lab_b = Column(Float)
+    color_l_bucket = Column(Integer)
+    color_a_bucket = Column(Integer)
+    color_b_bucket = Column(Integer)
+    
     # İlişkiler
     owners = relationship("User", secondary=user_clothes, back_populates="wardrobe")
     outfits = relationship("Outfit", secondary=outfit_clothes, back_populates="clothes")
+    
+    __table_args__ = (
+        Index('ix_clothes_color_bucket', 'color_l_bucket', 'color_a_bucket', 'color_b_bucket'),
+    )
 
 class Outfit(Base):
     __tablename__ = 'outfits'
@@ -67,6 +84,11 @@ class Outfit(Base):
     # İlişkiler
     user = relationship("User", back_populates="outfits")
     clothes = relationship("Clothing", secondary=outfit_clothes, back_populates="outfits")
+    
+    @property
+    def clothing_ids(self):
+        """Kombindeki kıyafetlerin id'leri (API yanıtı için)"""
+        return [c.id for c in self.clothes]
 
 class StylePreference(Base):
     __tablename__ = 'style_preferences'
@@ -79,3 +101,18 @@ class StylePreference(Base):
     
     # İlişkiler
     user = relationship("User", back_populates="style_preferences")
+
+class WardrobeStat(Base):
+    """Kullanıcı bazlı, artımlı güncellenen gardırop sayaçları"""
+    __tablename__ = 'wardrobe_stats'
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    dimension = Column(String, nullable=False)  # total, category, color, style, worn
+    key = Column(String, nullable=False)  # Kategori, renk adı, stil ya da kıyafet id'si
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('user_id', 'dimension', 'key', name='uq_wardrobe_stats_key'),
+        Index('ix_wardrobe_stats_top', 'user_id', 'dimension', 'count'),
+    )
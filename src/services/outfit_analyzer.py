@@ -8,13 +8,22 @@ import json
 import threading
 from concurrent.futures import ThreadPoolExecutor
 import concurrent.futures
+import tempfile
 import time
+import torchvision
 from transformers import pipeline, ViTFeatureExtractor, ViTForImageClassification
 from torchvision import models, transforms
 
 # Apple Silicon MPS optimizasyonu
 import torch.mps
 
+try:
+    from .colors import COLOR_CONFIG, color_lightness, color_names
+    from .detection import build_class_lookup, extract_detections, filter_clothing, merge_overlapping
+except ImportError:
+    from colors import COLOR_CONFIG, color_lightness, color_names
+    from detection import build_class_lookup, extract_detections, filter_clothing, merge_overlapping
+
 # API Configuration
 API_URL = "http://localhost:8080"
 
@@ -32,12 +41,81 @@ CLOTHING_CLASSES = {
     407: 'aksesuar'     # sunglasses
 }
 
+# Sınıf id -> kategori arama tablosu (vektörel filtreleme için)
+CLOTHING_LOOKUP = build_class_lookup(CLOTHING_CLASSES)
+
 # Model ayarları
 MODEL_CONFIG = {
     'input_size': (224, 224),  # ResNet giriş boyutu
     'threshold': 0.3,         # Güven eşiği
+    'merge_overlapping': False,  # Aynı kategoride çakışan kutuları birleştir (YOLO NMS'ine ek)
+    'merge_iou': 0.6,         # Birleştirme için IoU eşiği
 }
 
+def _default_intra_op_threads():
+    """Çekirdekleri worker'lar arasında paylaştır (WEB_CONCURRENCY: worker sayısı)"""
+    workers = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+# CPU çalışma profili (ortam değişkenleriyle worker başına ayarlanabilir)
+CPU_PROFILE = {
+    'intra_op_threads': int(os.getenv('AIKOMBIN_INTRA_OP_THREADS', _default_intra_op_threads())),  # 0: torch varsayılanı
+    'inter_op_threads': int(os.getenv('AIKOMBIN_INTER_OP_THREADS', '1')),  # 0: torch varsayılanı
+    'channels_last': os.getenv('AIKOMBIN_CHANNELS_LAST', '1') == '1',
+    'compile': os.getenv('AIKOMBIN_COMPILE', 'none'),  # none, torchscript, compile
+    'warmup': os.getenv('AIKOMBIN_WARMUP', '1') == '1',
+}
+
+def apply_cpu_threads(profile):
+    """Worker başına intra/inter-op thread sayılarını ayarla"""
+    if profile.get('intra_op_threads'):
+        torch.set_num_threads(profile['intra_op_threads'])
+    if profile.get('inter_op_threads'):
+        try:
+            torch.set_num_interop_threads(profile['inter_op_threads'])
+        except RuntimeError:
+            # Paralel iş başladıktan sonra değiştirilemez
+            print("inter-op thread sayısı zaten ayarlanmış, atlanıyor")
+
+def optimize_cpu_model(model, profile, cache_dir, name):
+    """CPU için channels_last ve TorchScript / torch.compile uygula"""
+    input_size = MODEL_CONFIG['input_size']
+    memory_format = torch.channels_last if profile.get('channels_last') else torch.contiguous_format
+    model = model.to(memory_format=memory_format)
+    
+    mode = profile.get('compile', 'none')
+    if mode == 'torchscript':
+        # Profil ya da torch sürümü değişince eski artefakt kullanılmasın
+        layout = 'cl' if profile.get('channels_last') else 'nchw'
+        versions = f"torch{torch.__version__}_tv{torchvision.__version__}".replace('+', '-')
+        script_path = os.path.join(
+            cache_dir, f'{name}_{input_size[0]}x{input_size[1]}_{layout}_{versions}.torchscript.pt'
+        )
+        if os.path.exists(script_path):
+            print(f"{name} TorchScript modeli cache'den yükleniyor...")
+            model = torch.jit.load(script_path, map_location='cpu')
+        else:
+            print(f"{name} TorchScript modeli oluşturuluyor...")
+            dummy = torch.zeros(1, 3, *input_size).contiguous(memory_format=memory_format)
+            with torch.inference_mode():
+                model = torch.jit.trace(model, dummy)
+            model = torch.jit.freeze(model)
+            # Aynı anda açılan worker'lar yarım yazılmış dosyayı okumasın
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            os.close(fd)
+            try:
+                torch.jit.save(model, tmp_path)
+                os.replace(tmp_path, script_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    elif mode == 'compile':
+        # Inductor derleme artefaktlarını model cache'inde tut
+        os.environ.setdefault('TORCHINDUCTOR_CACHE_DIR', os.path.join(cache_dir, 'inductor'))
+        model = torch.compile(model)
+    
+    return model
+
 # Basit kıyafet kategorileri
 CLOTHING_CATEGORIES = {
     'üst_giyim': ['beyaz', 'açık', 'koyu'],
@@ -47,7 +125,10 @@ CLOTHING_CATEGORIES = {
 }
 
 class OutfitAnalyzer:
-    def __init__(self):
+    def __init__(self, cpu_profile=None):
+        # CPU çalışma profili
+        self.cpu_profile = {**CPU_PROFILE, **(cpu_profile or {})}
+        
         # Önbellek sistemi
         self.cache = {}
         self.cache_stats = {'hits': 0, 'misses': 0}
@@ -95,6 +176,7 @@ class OutfitAnalyzer:
             else:
                 self.device = torch.device("cpu")
                 print("CPU kullanılıyor")
+                apply_cpu_threads(self.cpu_profile)
             
             # YOLO modelini yükle
             yolo_path = os.path.join(self.model_cache_dir, 'yolov8n.pt')
@@ -116,6 +198,10 @@ class OutfitAnalyzer:
             if self.device.type == "mps":
                 self.model = self.model.to(self.device)
                 self.yolo_model.to(self.device)
+            else:
+                self.model = optimize_cpu_model(
+                    self.model, self.cpu_profile, self.model_cache_dir, 'resnet50'
+                )
             
             # Görüntü dönüştürme
             self.transform = transforms.Compose([
@@ -158,6 +244,10 @@ class OutfitAnalyzer:
                 device=self.device
             )
             
+            # İlk istekteki gecikmeyi önlemek için ısınma
+            if self.cpu_profile.get('warmup'):
+                self._warmup()
+            
             # Model durumunu kaydet
             with open(self.model_state_file, 'w') as f:
                 json.dump({'initialized': True}, f)
@@ -168,6 +258,31 @@ class OutfitAnalyzer:
             print(f"Model yükleme hatası: {str(e)}")
             raise e
 
+    def _warmup(self):
+        """Modelleri sahte girdilerle bir kez çalıştır"""
+        print("Modeller ısındırılıyor...")
+        dummy_image = Image.new('RGB', MODEL_CONFIG['input_size'])
+        self.yolo_model(dummy_image, verbose=False)
+        self._classify(dummy_image)
+        self.classifier(dummy_image)
+
+    def _prepare_tensor(self, image):
+        """PIL görüntüsünü model girdisine dönüştür"""
+        image_tensor = self.transform(image).unsqueeze(0)
+        if self.device.type == "mps":
+            return image_tensor.to(self.device)
+        if self.cpu_profile.get('channels_last'):
+            image_tensor = image_tensor.contiguous(memory_format=torch.channels_last)
+        return image_tensor
+
+    def _classify(self, image):
+        """ResNet50 ile sınıflandır, (olasılık, sınıf) döndür"""
+        with torch.inference_mode():
+            output = self.model(self._prepare_tensor(image))
+            probabilities = torch.nn.functional.softmax(output[0], dim=0)
+            top_prob, top_catid = torch.topk(probabilities, 1)
+        return top_prob, top_catid
+
     def _iou(self, box1, box2):
         """Intersection over Union hesapla"""
         box1 = np.array(box1)
@@ -207,8 +322,15 @@ class OutfitAnalyzer:
             flags=cv2.KMEANS_RANDOM_CENTERS
         )
         
-        colors = ['#{:02x}{:02x}{:02x}'.format(int(c[0]), int(c[1]), int(c[2])) 
-                 for c in kmeans[2]]
+        # Küme merkezleri rastgele sıradadır: piksel sayısına göre azalan sırala,
+        # böylece ilk renk gerçekten baskın renk olur
+        _, labels, centers = kmeans
+        sizes = np.bincount(labels.ravel(), minlength=len(centers))
+        order = np.argsort(-sizes, kind='stable')
+        
+        # OpenCV BGR sırası -> #rrggbb
+        colors = ['#{:02x}{:02x}{:02x}'.format(int(c[2]), int(c[1]), int(c[0])) 
+                 for c in centers[order]]
         return colors
 
     def _get_category(self, idx):
@@ -253,22 +375,24 @@ class OutfitAnalyzer:
         base_style = styles.get(idx, "casual")
         
         if color:
-            if color.startswith("#00") or color.startswith("#11"):  # Koyu renkler
+            lightness = color_lightness(color)
+            if lightness < COLOR_CONFIG['dark_lightness']:  # Koyu renkler
                 if base_style == "casual":
                     return "smart-casual"
                 elif base_style == "sporty":
                     return "athleisure"
-            elif color.startswith("#FF") or color.startswith("#EE"):  # Açık renkler
+            elif lightness > COLOR_CONFIG['light_lightness']:  # Açık renkler
                 if base_style == "formal":
                     return "business-casual"
         
         return base_style
 
-    def analyze_image(self, image_path: str):
+    def analyze_image(self, image_path: str, raise_errors=False):
         """Kıyafet analizi
         
         Args:
             image_path: Analiz edilecek görüntünün yolu
+            raise_errors: Hataları "kıyafet yok" sonucuna çevirmek yerine yükselt
             
         Returns:
             Dict: Analiz sonuçlarını içeren sözlük
@@ -286,39 +410,22 @@ class OutfitAnalyzer:
             # YOLO ile tespit
             results = self.yolo_model(image)
             
-            # Tespit edilen nesneleri işle
-            detections = []
-            for r in results:
-                boxes = r.boxes
-                for box in boxes:
-                    b = box.xyxy[0].tolist()
-                    cls = int(box.cls)
-                    conf = float(box.conf)
-                    
-                    if cls in CLOTHING_CLASSES:
-                        detection = {
-                            'class': CLOTHING_CLASSES[cls],
-                            'confidence': conf,
-                            'box': b
-                        }
-                        detections.append(detection)
+            # Tespit edilen nesneleri işle: diziler bütün olarak alınır,
+            # kıyafet sınıfları tek adımda süzülür
+            xyxy, cls, conf = extract_detections(results)
+            detections = filter_clothing(xyxy, cls, conf, CLOTHING_LOOKUP)
+            if MODEL_CONFIG['merge_overlapping']:
+                # YOLO NMS'i sınıf bazındadır; aynı kategoriye düşen farklı
+                # sınıfların (ör. 398/399) çakışan kutularını teke indirir.
+                # Çıktıyı değiştirdiği için varsayılan olarak kapalı.
+                detections = merge_overlapping(detections, MODEL_CONFIG['merge_iou'])
             
             # Eğer kıyafet tespit edilmediyse
-            if not detections:
+            if not len(detections):
                 return {"kıyafet_var_mı": False}
             
-            # Görüntü tensörünü hazırla
-            image_tensor = self.transform(image).unsqueeze(0)
-            if self.device.type == "mps":
-                image_tensor = image_tensor.to(self.device)
-            
-            # ResNet50 ile sınıflandırma
-            with torch.no_grad():
-                output = self.model(image_tensor)
-                probabilities = torch.nn.functional.softmax(output[0], dim=0)
-                
-            # En yüksek olasılıklı sınıfı al
-            top_prob, top_catid = torch.topk(probabilities, 1)
+            # ResNet50 ile sınıflandırma, en yüksek olasılıklı sınıfı al
+            top_prob, top_catid = self._classify(image)
             
             # Kategori ve alt kategori bilgilerini al
             category = self._get_category(top_catid.item())
@@ -331,19 +438,21 @@ class OutfitAnalyzer:
             style = self._predict_style(top_catid.item(), colors[0] if colors else None)
             
             # ViT ile ek analiz
-            vit_results = self.classifier(image)
+            with torch.inference_mode():
+                vit_results = self.classifier(image)
             
             # Sonuçları hazırla
             results = {
                 "kıyafet_var_mı": True,
                 "tespit": {
-                    "kıyafetler": detections,
+                    "kıyafetler": detections.to_list(CLOTHING_LOOKUP.names),
                     "güven": float(top_prob.item())
                 },
                 "analiz": {
                     "kategori": category,
                     "alt_kategori": subcategory,
                     "renkler": colors,
+                    "renk_adları": color_names.nearest(colors),
                     "stil": style,
                     "vit_analiz": vit_results[0] if vit_results else None
                 }
@@ -359,16 +468,25 @@ class OutfitAnalyzer:
             
             return results
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Hata: {str(e)}")
             return {"kıyafet_var_mı": False}
 
-    def process_and_save(self, input_path, output_path=None):
-        """Görüntüyü analiz et ve sonuçları kaydet"""
+    def process_and_save(self, input_path, output_path=None, delete_empty=True, raise_errors=False):
+        """Görüntüyü analiz et ve sonuçları kaydet
+        
+        Args:
+            input_path: Analiz edilecek görüntünün yolu
+            output_path: Sonuç JSON dosyasının yolu (opsiyonel)
+            delete_empty: Kıyafet bulunmayan görüntüyü sil
+            raise_errors: Hataları yükselt; hata durumunda görüntü silinmez
+        """
         try:
-            results = self.analyze_image(input_path)
+            results = self.analyze_image(input_path, raise_errors=raise_errors)
             
             if not results["kıyafet_var_mı"]:
-                if os.path.exists(input_path):
+                if delete_empty and os.path.exists(input_path):
                     os.remove(input_path)
             elif output_path:
                 with open(output_path, 'w', encoding='utf-8') as f:
@@ -376,5 +494,7 @@ class OutfitAnalyzer:
                     
             return results
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"İşleme hatası: {str(e)}")
             return {"kıyafet_var_mı": False}
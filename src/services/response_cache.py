@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Önbellek ayarları
+CACHE_CONFIG = {
+    'max_size': 512,  # Bellekte tutulacak maksimum yanıt sayısı
+}
+
+class ResponseCache:
+    """Kullanıcı sürümüne bağlı, serileştirilmiş yanıt gövdeleri için LRU önbellek
+
+    Anahtar olarak ETag kullanılır. ETag kullanıcının önbellek sürümünü
+    içerdiği için yazma işlemleri sürümü artırdığında eski kayıtlar bir
+    daha okunmaz ve LRU sırasıyla önbellekten düşer.
+    """
+
+    def __init__(self, max_size=CACHE_CONFIG['max_size']):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def make_etag(self, kind, user_id, version, variant=None):
+        """Kaynak türü, kullanıcı, sürüm ve filtreden ETag üret"""
+        key = f"{kind}:{user_id}:{version}:{variant or ''}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return f'"{digest}"'
+
+    def get(self, etag):
+        """Önbellekteki gövdeyi getir, yoksa None"""
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.stats['hits'] += 1
+            return body
+
+    def set(self, etag, body):
+        """Gövdeyi önbelleğe ekle"""
+        with self._lock:
+            self._entries[etag] = body
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match başlığı verilen ETag ile eşleşiyor mu"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # Zayıf karşılaştırma (RFC 7232)
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import orjson
+from pydantic import BaseModel, ConfigDict, Field
+
+# API yanıt modelleri ve hızlı serileştirme
+
+class ClothingOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    category: str
+    subcategory: str
+    color: Optional[str] = None
+    color_name: Optional[str] = None
+    palette: Optional[List[str]] = None
+    style: Optional[str] = None
+    image_url: str
+    created_at: Optional[datetime] = None
+
+class OutfitOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: Optional[int] = None
+    name: Optional[str] = None
+    occasion: Optional[str] = None
+    mood: Optional[str] = None
+    weather: Optional[str] = None
+    season: Optional[str] = None
+    rating: Optional[int] = None
+    notes: Optional[str] = None
+    created_at: Optional[datetime] = None
+    clothing_ids: List[int] = []
+
+class Detection(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    class_: str = Field(alias='class')
+    confidence: float
+    box: Optional[List[float]] = None  # Kompakt modda yok
+
+class DetectionSummary(BaseModel):
+    kıyafetler: List[Detection]
+    güven: float
+
+class AnalysisDetail(BaseModel):
+    kategori: str
+    alt_kategori: str
+    renkler: List[str]
+    renk_adları: List[str] = []
+    stil: str
+    vit_analiz: Optional[Dict] = None  # Kompakt modda yok
+
+class AnalysisResult(BaseModel):
+    kıyafet_var_mı: bool
+    tespit: Optional[DetectionSummary] = None
+    analiz: Optional[AnalysisDetail] = None
+
+# Alan listeleri modül yüklenirken bir kez hesaplanır
+CLOTHING_FIELDS = tuple(ClothingOut.model_fields)
+OUTFIT_FIELDS = tuple(OutfitOut.model_fields)
+
+# Kompakt modda çıkarılan ağır alanlar
+COMPACT_EXCLUDE = {
+    'clothing': {'palette', 'created_at'},
+    'outfit': {'notes', 'created_at'},
+}
+
+def select_fields(all_fields, fields=None, compact=False, kind=None):
+    """İstenen alanları doğrula ve serileştirilecek alan listesini döndür
+
+    Args:
+        all_fields: Modelin tüm alanları
+        fields: Virgülle ayrılmış alan listesi (opsiyonel)
+        compact: Ağır alanları çıkar
+        kind: COMPACT_EXCLUDE anahtarı
+    """
+    if fields:
+        selected = tuple(f.strip() for f in fields.split(',') if f.strip())
+        unknown = [f for f in selected if f not in all_fields]
+        if unknown:
+            raise ValueError(f"Bilinmeyen alan(lar): {', '.join(unknown)}")
+    else:
+        selected = all_fields
+    if compact and kind:
+        selected = tuple(f for f in selected if f not in COMPACT_EXCLUDE[kind])
+    return selected
+
+def _dump_rows(objects, fields):
+    # ORM nesnelerinden doğrudan sözlük üret; jsonable_encoder'ın yansımalı gezintisini atlar
+    return orjson.dumps([{f: getattr(obj, f) for f in fields} for obj in objects])
+
+def serialize_clothes(clothes, fields=None, compact=False):
+    """Kıyafet listesini JSON byte dizisine dönüştür"""
+    return _dump_rows(clothes, select_fields(CLOTHING_FIELDS, fields, compact, 'clothing'))
+
+def serialize_outfits(outfits, fields=None, compact=False):
+    """Kombin listesini JSON byte dizisine dönüştür"""
+    return _dump_rows(outfits, select_fields(OUTFIT_FIELDS, fields, compact, 'outfit'))
+
+def clothing_to_dict(clothing):
+    return {f: getattr(clothing, f) for f in CLOTHING_FIELDS}
+
+def outfit_to_dict(outfit):
+    return {f: getattr(outfit, f) for f in OUTFIT_FIELDS}
+
+def compact_analysis(result):
+    """vit_analiz ve ham tespit kutularını çıkar (önbellekteki sonucu değiştirmez)"""
+    if not result.get("kıyafet_var_mı"):
+        return result
+
+    tespit = result["tespit"]
+    return {
+        "kıyafet_var_mı": True,
+        "tespit": {
+            "kıyafetler": [
+                {k: v for k, v in d.items() if k != "box"} for d in tespit["kıyafetler"]
+            ],
+            "güven": tespit["güven"],
+        },
+        "analiz": {k: v for k, v in result["analiz"].items() if k != "vit_analiz"},
+    }